@@ -188,17 +188,21 @@ class PGBART(ArrayStepShared):
             (self.trees_shape, self.leaves_shape, self.bart.Y.shape[0]), init_mean
         ).astype(config.floatX)
         self.sum_trees_noi = self.sum_trees - init_mean
+        self.prior_prob_leaf_node = compute_prior_probability(self.bart.alpha, self.bart.beta)
+        # Allocate the trees for the levels they are expected to reach, so the particles copied
+        # from this tree rarely have to grow their node arrays
+        initial_depth = compute_initial_depth(self.prior_prob_leaf_node)
         self.a_tree = Tree.new_tree(
             leaf_node_value=init_mean / self.m,
             idx_data_points=np.arange(self.num_observations, dtype="int32"),
             num_observations=self.num_observations,
             shape=self.leaves_shape,
             split_rules=self.split_rules,
+            capacity=2 ** (initial_depth + 1) - 1,
         )
 
         self.normal = NormalSampler(1, self.leaves_shape)
         self.uniform = UniformSampler(0, 1)
-        self.prior_prob_leaf_node = compute_prior_probability(self.bart.alpha, self.bart.beta)
         self.ssv = SampleSplittingVariable(self.alpha_vec)
 
         self.tune = True
@@ -282,8 +286,7 @@ class PGBART(ArrayStepShared):
                     if self.iter > self.m:
                         self.ssv = SampleSplittingVariable(self.alpha_vec)
 
-                    for index in new_tree.get_split_variables():
-                        self.alpha_vec[index] += 1
+                    np.add.at(self.alpha_vec, new_tree.get_split_variables(), 1)
 
                     # update standard deviation at leaf nodes
                     if self.iter > 2:
@@ -293,8 +296,7 @@ class PGBART(ArrayStepShared):
 
                 else:
                     # update the variable inclusion
-                    for index in new_tree.get_split_variables():
-                        variable_inclusion[index] += 1
+                    np.add.at(variable_inclusion, new_tree.get_split_variables(), 1)
 
         if not self.tune:
             self.bart.all_trees.append(self.all_trees)
@@ -462,6 +464,34 @@ def compute_prior_probability(alpha: int, beta: int) -> List[float]:
     return prior_leaf_prob
 
 
+def compute_initial_depth(prior_prob_leaf_node: List[float], min_nodes: float = 0.1) -> int:
+    """
+    Calculate the deepest level expected to have at least `min_nodes` nodes.
+
+    The levels of the trees can go as deep as `prior_prob_leaf_node`, but most trees are much
+    shallower, the expected number of nodes of each level decreases quickly with its depth.
+
+    Parameters
+    ----------
+    prior_prob_leaf_node : list
+        Probability of a node being a leaf node at each depth
+    min_nodes : float
+        Minimum expected number of nodes of the level
+
+    Returns
+    -------
+    int
+    """
+    depth = 0
+    prob_node = 1.0  # probability of each node of the next level being in the tree
+    for prob_leaf in prior_prob_leaf_node[:-1]:
+        prob_node *= 1 - prob_leaf
+        if 2 ** (depth + 1) * prob_node < min_nodes:
+            break
+        depth += 1
+    return depth
+
+
 def grow_tree(
     tree,
     index_leaf_node,
@@ -481,8 +511,9 @@ def grow_tree(
 
     index_selected_predictor = ssv.rvs()
     selected_predictor = available_predictors[index_selected_predictor]
-    idx_data_points, available_splitting_values = filter_missing_values(
-        X[idx_data_points, selected_predictor], idx_data_points, missing_data
+    splitting_values = X[idx_data_points, selected_predictor]
+    _, available_splitting_values = filter_missing_values(
+        splitting_values, idx_data_points, missing_data
     )
 
     split_rule = tree.split_rules[selected_predictor]
@@ -492,7 +523,8 @@ def grow_tree(
     if split_value is None:
         return None
 
-    to_left = split_rule.divide(available_splitting_values, split_value)
+    # Missing values go to the right child, as when predicting
+    to_left = split_rule.divide(splitting_values, split_value)
     new_idx_data_points = idx_data_points[to_left], idx_data_points[~to_left]
 
     current_node_children = (
@@ -522,7 +554,7 @@ def grow_tree(
         )
         tree.set_node(current_node_children[idx], new_node)
 
-    tree.grow_leaf_node(current_node, selected_predictor, split_value, index_leaf_node)
+    tree.grow_leaf_node(selected_predictor, split_value, index_leaf_node)
     return current_node_children
 
 
@@ -550,7 +582,7 @@ def draw_leaf_value(
 
     if y_mu_pred.size == 1:
         mu_mean = np.full(shape, y_mu_pred.item() / m) + norm
-    elif y_mu_pred.size < 3 or response == "constant":
+    elif y_mu_pred.size < 3 or response == "constant" or np.isnan(x_mu).any():
         mu_mean = fast_mean(y_mu_pred) / m + norm
     else:
         mu_mean, linear_params = fast_linear_fit(x=x_mu, y=y_mu_pred, m=m, norm=norm)
@@ -12,49 +12,42 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from functools import lru_cache
-from typing import Dict, Generator, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
 
 import numpy as np
 import numpy.typing as npt
+from numba import njit, prange
 from pytensor import config
 
-from .split_rules import SplitRule
+from .split_rules import ContinuousSplitRule, SplitRule
 
 
-class Node:
+class Node(NamedTuple):
     """Node of a binary tree.
 
+    Nodes are not stored as objects in the tree, this is a view of the attributes of a node used
+    to read (`Tree.get_node`) and write (`Tree.set_node`) them.
+
     Attributes
     ----------
-    value : npt.NDArray[np.float_]
-    idx_data_points : Optional[npt.NDArray[np.int_]]
+    value : Union[float, npt.NDArray[np.float_]]
+    idx_data_points : Optional[npt.NDArray[np.int32]]
     idx_split_variable : int
     linear_params: Optional[List[float]] = None
     """
 
-    __slots__ = "value", "nvalue", "idx_split_variable", "idx_data_points", "linear_params"
-
-    def __init__(
-        self,
-        value: npt.NDArray[np.float_] = np.array([-1.0]),
-        nvalue: int = 0,
-        idx_data_points: Optional[npt.NDArray[np.int_]] = None,
-        idx_split_variable: int = -1,
-        linear_params: Optional[List[npt.NDArray[np.float_]]] = None,
-    ) -> None:
-        self.value = value
-        self.nvalue = nvalue
-        self.idx_data_points = idx_data_points
-        self.idx_split_variable = idx_split_variable
-        self.linear_params = linear_params
+    value: Union[float, npt.NDArray[np.float_]] = np.array([-1.0])
+    nvalue: int = 0
+    idx_data_points: Optional[npt.NDArray[np.int32]] = None
+    idx_split_variable: int = -1
+    linear_params: Optional[List[npt.NDArray[np.float_]]] = None
 
     @classmethod
     def new_leaf_node(
         cls,
         value: npt.NDArray[np.float_],
         nvalue: int = 0,
-        idx_data_points: Optional[npt.NDArray[np.int_]] = None,
+        idx_data_points: Optional[npt.NDArray[np.int32]] = None,
         idx_split_variable: int = -1,
         linear_params: Optional[List[npt.NDArray[np.float_]]] = None,
     ) -> "Node":
@@ -73,6 +66,26 @@ class Node:
         return not self.is_split_node()
 
 
+# Scalar attributes of the nodes of a tree. The ones read when traversing the tree (hot) are
+# stored apart from the ones only used when growing it (cold), so a traversal only loads the
+# former, four nodes per cache line. Aligned, so each field can be passed to numba functions as a
+# strided view.
+HOT_NODE_DTYPE = np.dtype([("split_value", np.float64), ("split_var", np.int64)], align=True)
+COLD_NODE_DTYPE = np.dtype(
+    [("nvalue", np.int32), ("data_start", np.int32), ("data_stop", np.int32)], align=True
+)
+
+# Options of the numba functions of this module. The fastmath flags are the ones of
+# fastmath=True except nnan and ninf, as missing values are nan and have to go to the right
+# child when traversing the trees.
+NJIT_OPTIONS: Dict[str, Any] = {
+    "cache": True,
+    "boundscheck": False,
+    "fastmath": {"nsz", "arcp", "contract", "afn", "reassoc"},
+    "error_model": "numpy",
+}
+
+
 def get_idx_left_child(index) -> int:
     return index * 2 + 1
 
@@ -81,8 +94,12 @@ def get_idx_right_child(index) -> int:
     return index * 2 + 2
 
 
-@lru_cache
 def get_depth(index: int) -> int:
+    """Return the depth of the node at position `index`, 0 for the root node.
+
+    Nodes are stored in breadth-first order, so the depth follows from the position and there is
+    no need to store it per node.
+    """
     return (index + 1).bit_length() - 1
 
 
@@ -92,65 +109,177 @@ class Tree:
     A full binary tree is a tree where each node has exactly zero or two children.
     This structure is used as the basic component of the Bayesian Additive Regression Tree (BART)
 
+    The nodes are stored in breadth-first order, based in the array method for storing binary
+    trees (https://en.wikipedia.org/wiki/Binary_tree#Arrays). Instead of one object per node,
+    the attributes of the nodes are stored in arrays indexed by the node's position, so the
+    children of the node at position ``i`` are at positions ``2 * i + 1`` and ``2 * i + 2``.
+    The arrays are grown one full level at a time when needed.
+
     Attributes
     ----------
-    tree_structure : Dict[int, Node]
-        A dictionary that represents the nodes stored in breadth-first order, based in the array
-        method for storing binary trees (https://en.wikipedia.org/wiki/Binary_tree#Arrays).
-        The dictionary's keys are integers that represent the nodes position.
-        The dictionary's values are objects of type Node that represent the split and leaf nodes
-        of the tree itself.
+    hot_nodes : npt.NDArray
+        Record array with the attributes of each node used to traverse the tree, see
+        HOT_NODE_DTYPE:
+
+        - split_value: Splitting value of each split node. Non scalar splitting values, like the
+          ones from SubsetSplitRule, are stored in `split_subsets` instead and set to nan here.
+        - split_var: Index of the splitting variable of each node, -1 for leaf nodes and unused
+          positions.
+    cold_nodes : npt.NDArray
+        Record array with the attributes of each node only used to grow the tree, see
+        COLD_NODE_DTYPE:
+
+        - nvalue: Number of data points that reached each node.
+        - data_start and data_stop: Slice of `data_points` with the data points that reached
+          each node.
+
+        Each field of both arrays is also available as a property of the tree, as a view.
+    split_subsets : Dict[int, npt.NDArray]
+        Non scalar splitting values indexed by node position.
+    leaf_values : npt.NDArray[np.float_]
+        Array of shape (capacity, shape) with the value of the leaf nodes.
+    linear_params : npt.NDArray[np.float_]
+        Array of shape (capacity, 2, shape) with the intercept and slope of the leaf nodes with
+        a linear response, nan for leaf nodes with a constant response.
+    data_points : Optional[npt.NDArray[np.int32]]
+        Indexes of the data points of all the leaf nodes, with the ones of each leaf node stored
+        contiguously. When a leaf node is split, the data points of its children are stored in
+        its slice, so no per node allocation is needed.
+    fitted_values : List[Optional[npt.NDArray[np.float_]]]
+        Fitted value of each data point of the leaf nodes with a linear response.
     output: Optional[npt.NDArray[np.float_]]
         Array of shape number of observations, shape
     split_rules : List[SplitRule]
         List of SplitRule objects, one per column in input data.
         Allows using different split rules for different columns. Default is ContinuousSplitRule.
         Other options are OneHotSplitRule and SubsetSplitRule, both meant for categorical variables.
-    idx_leaf_nodes : Optional[List[int]], by default None.
-        Array with the index of the leaf nodes of the tree.
-
-    Parameters
-    ----------
-    tree_structure : Dictionary of nodes
-    output : Array of shape number of observations, shape
-    idx_leaf_nodes :  List with the index of the leaf nodes of the tree.
+    idx_leaf_nodes : Optional[npt.NDArray[np.int_]], by default None.
+        Array with the index of the leaf nodes of the tree in its first `n_leaves` positions.
+        It has the same capacity as the node arrays, a full binary tree has less leaf nodes than
+        nodes.
+    leaf_pos : Optional[npt.NDArray[np.int_]], by default None.
+        Position of each leaf node in `idx_leaf_nodes`, indexed by node position, so leaf nodes
+        can be removed from it in constant time.
+    n_leaves : int
+        Number of leaf nodes stored in `idx_leaf_nodes`.
+    _subtree_mean : Optional[npt.NDArray[np.float_]]
+        Average of the leaf values below each node, weighted by the proportion of data points
+        that went to each branch. Computed when needed and reset each time the tree is modified.
+    _constant_subtrees : Optional[Tuple[Tuple[int, ...], npt.NDArray[np.bool_]]]
+        Last set of excluded variables and the nodes whose prediction does not depend on the
+        point being predicted when excluding them. Reset each time the tree is modified.
+    _compiled_descend : Optional[Callable]
+        Function compiled by `predict_compiled` for the current structure of the tree. Reset each
+        time the tree is modified.
     """
 
-    __slots__ = ("tree_structure", "output", "idx_leaf_nodes", "split_rules")
+    __slots__ = (
+        "hot_nodes",
+        "cold_nodes",
+        "split_subsets",
+        "leaf_values",
+        "linear_params",
+        "data_points",
+        "fitted_values",
+        "output",
+        "idx_leaf_nodes",
+        "leaf_pos",
+        "n_leaves",
+        "split_rules",
+        "_subtree_mean",
+        "_constant_subtrees",
+        "_compiled_descend",
+    )
 
     def __init__(
         self,
-        tree_structure: Dict[int, Node],
+        hot_nodes: npt.NDArray,
+        cold_nodes: npt.NDArray,
+        split_subsets: Dict[int, npt.NDArray],
+        leaf_values: npt.NDArray[np.float_],
+        linear_params: npt.NDArray[np.float_],
+        data_points: Optional[npt.NDArray[np.int32]],
+        fitted_values: List[Optional[npt.NDArray[np.float_]]],
         output: npt.NDArray[np.float_],
         split_rules: List[SplitRule],
-        idx_leaf_nodes: Optional[List[int]] = None,
+        idx_leaf_nodes: Optional[npt.NDArray[np.int_]] = None,
+        leaf_pos: Optional[npt.NDArray[np.int_]] = None,
+        n_leaves: int = 0,
     ) -> None:
-        self.tree_structure = tree_structure
+        self.hot_nodes = hot_nodes
+        self.cold_nodes = cold_nodes
+        self.split_subsets = split_subsets
+        self.leaf_values = leaf_values
+        self.linear_params = linear_params
+        self.data_points = data_points
+        self.fitted_values = fitted_values
         self.idx_leaf_nodes = idx_leaf_nodes
+        self.leaf_pos = leaf_pos
+        self.n_leaves = n_leaves
         self.split_rules = split_rules
         self.output = output
+        self._subtree_mean: Optional[npt.NDArray[np.float_]] = None
+        self._constant_subtrees: Optional[Tuple[Tuple[int, ...], npt.NDArray[np.bool_]]] = None
+        self._compiled_descend: Optional[Callable] = None
 
     @classmethod
     def new_tree(
         cls,
         leaf_node_value: npt.NDArray[np.float_],
-        idx_data_points: Optional[npt.NDArray[np.int_]],
+        idx_data_points: Optional[npt.NDArray[np.int32]],
         num_observations: int,
         shape: int,
         split_rules: List[SplitRule],
+        capacity: int = 1,
     ) -> "Tree":
-        return cls(
-            tree_structure={
-                0: Node.new_leaf_node(
-                    value=leaf_node_value,
-                    nvalue=len(idx_data_points) if idx_data_points is not None else 0,
-                    idx_data_points=idx_data_points,
-                )
-            },
-            idx_leaf_nodes=[0],
+        """Create a tree with a single leaf node.
+
+        The node arrays are allocated for `capacity` nodes, they are grown when needed.
+        """
+        tree = cls(
+            hot_nodes=_new_hot_nodes(capacity),
+            cold_nodes=np.zeros(capacity, dtype=COLD_NODE_DTYPE),
+            split_subsets={},
+            leaf_values=np.zeros((capacity, shape)),
+            linear_params=np.full((capacity, 2, shape), np.nan),
+            data_points=np.empty(
+                len(idx_data_points) if idx_data_points is not None else 0, dtype=np.int32
+            ),
+            fitted_values=[None] * capacity,
+            idx_leaf_nodes=np.full(capacity, -1, dtype=np.int64),
+            leaf_pos=np.full(capacity, -1, dtype=np.int64),
             output=np.zeros((num_observations, shape)).astype(config.floatX),
             split_rules=split_rules,
         )
+        tree.set_node(
+            0,
+            Node.new_leaf_node(
+                value=leaf_node_value,
+                nvalue=len(idx_data_points) if idx_data_points is not None else 0,
+                idx_data_points=idx_data_points,
+            ),
+        )
+        return tree
+
+    @property
+    def split_value(self) -> npt.NDArray[np.float_]:
+        return self.hot_nodes["split_value"]
+
+    @property
+    def split_var(self) -> npt.NDArray[np.int_]:
+        return self.hot_nodes["split_var"]
+
+    @property
+    def nvalue(self) -> npt.NDArray[np.int_]:
+        return self.cold_nodes["nvalue"]
+
+    @property
+    def data_start(self) -> npt.NDArray[np.int_]:
+        return self.cold_nodes["data_start"]
+
+    @property
+    def data_stop(self) -> npt.NDArray[np.int_]:
+        return self.cold_nodes["data_stop"]
 
     def __getitem__(self, index) -> Node:
         return self.get_node(index)
@@ -158,76 +287,250 @@ class Tree:
     def __setitem__(self, index, node) -> None:
         self.set_node(index, node)
 
-    def copy(self) -> "Tree":
-        tree: Dict[int, Node] = {
-            k: Node(
-                value=v.value,
-                nvalue=v.nvalue,
-                idx_data_points=v.idx_data_points,
-                idx_split_variable=v.idx_split_variable,
-                linear_params=v.linear_params,
-            )
-            for k, v in self.tree_structure.items()
-        }
-        idx_leaf_nodes = self.idx_leaf_nodes.copy() if self.idx_leaf_nodes is not None else None
-        return Tree(
-            tree_structure=tree,
-            idx_leaf_nodes=idx_leaf_nodes,
-            output=self.output,
-            split_rules=self.split_rules,
+    def __reduce__(self) -> Tuple[type, Tuple]:
+        """Pickle the arrays of the tree, the cached values are computed again when needed."""
+        return (
+            Tree,
+            (
+                self.hot_nodes,
+                self.cold_nodes,
+                self.split_subsets,
+                self.leaf_values,
+                self.linear_params,
+                self.data_points,
+                self.fitted_values,
+                self.output,
+                self.split_rules,
+                self.idx_leaf_nodes,
+                self.leaf_pos,
+                self.n_leaves,
+            ),
         )
 
+    def copy(self) -> "Tree":
+        """Copy the node arrays of the tree, the output array is shared with the copy.
+
+        All the attributes of the tree are plain NumPy arrays or containers of them, so each one is
+        copied with a single buffer copy. The arrays of the nodes with non scalar split values,
+        and the fitted values of the leaf nodes with a linear response, are shared, they are never
+        modified in place.
+        """
+        tree = Tree.__new__(Tree)
+        tree.hot_nodes = self.hot_nodes.copy()
+        tree.cold_nodes = self.cold_nodes.copy()
+        tree.split_subsets = self.split_subsets.copy()
+        tree.leaf_values = self.leaf_values.copy()
+        tree.linear_params = self.linear_params.copy()
+        tree.data_points = None if self.data_points is None else self.data_points.copy()
+        tree.fitted_values = self.fitted_values.copy()
+        tree.idx_leaf_nodes = None if self.idx_leaf_nodes is None else self.idx_leaf_nodes.copy()
+        tree.leaf_pos = None if self.leaf_pos is None else self.leaf_pos.copy()
+        tree.n_leaves = self.n_leaves
+        tree.output = self.output
+        tree.split_rules = self.split_rules
+        tree._subtree_mean = None
+        tree._constant_subtrees = None
+        tree._compiled_descend = None
+        return tree
+
     def get_node(self, index: int) -> Node:
-        return self.tree_structure[index]
+        """Return a view of the node at position `index`.
+
+        Modifying the returned node does not modify the tree, use `set_node` instead.
+        """
+        cold_node = self.cold_nodes[index]
+        idx_split_variable = int(self.hot_nodes[index]["split_var"])
+        if idx_split_variable >= 0:
+            return Node(
+                value=self._get_split_value(index),
+                nvalue=int(cold_node["nvalue"]),
+                idx_split_variable=idx_split_variable,
+            )
+
+        linear_params = None
+        value = self.fitted_values[index]
+        if value is None:
+            value = self.leaf_values[index]
+        else:
+            linear_params = [self.linear_params[index, 0], self.linear_params[index, 1]]
+        idx_data_points = None
+        if self.data_points is not None:
+            idx_data_points = self.data_points[cold_node["data_start"] : cold_node["data_stop"]]
+        return Node(
+            value=value,
+            nvalue=int(cold_node["nvalue"]),
+            idx_data_points=idx_data_points,
+            linear_params=linear_params,
+        )
 
     def set_node(self, index: int, node: Node) -> None:
-        self.tree_structure[index] = node
-        if node.is_leaf_node() and self.idx_leaf_nodes is not None:
-            self.idx_leaf_nodes.append(index)
+        """Set the node at position `index`.
+
+        The data points of a node are stored in the slice of its parent, after the ones of its
+        left sibling, so the left child of a node has to be set before the right one.
+        """
+        self._ensure_capacity(index)
+        self._clear_cache()
+        self.hot_nodes["split_var"][index] = node.idx_split_variable
+        self.cold_nodes["nvalue"][index] = node.nvalue
+        self._set_data_points(index, node.idx_data_points)
+        if node.is_split_node():
+            self._set_split_value(index, node.value)
+        else:
+            self._set_leaf_value(index, node.value, node.linear_params)
+            if self.idx_leaf_nodes is not None and self.leaf_pos is not None:
+                self.idx_leaf_nodes[self.n_leaves] = index
+                self.leaf_pos[index] = self.n_leaves
+                self.n_leaves += 1
 
     def grow_leaf_node(
         self,
-        current_node: Node,
         selected_predictor: int,
         split_value: npt.NDArray[np.float_],
         index_leaf_node: int,
     ) -> None:
-        current_node.value = split_value
-        current_node.idx_split_variable = selected_predictor
-        current_node.idx_data_points = None
-        if self.idx_leaf_nodes is not None:
-            self.idx_leaf_nodes.remove(index_leaf_node)
+        self._clear_cache()
+        self.hot_nodes["split_var"][index_leaf_node] = selected_predictor
+        self._set_split_value(index_leaf_node, split_value)
+        self.linear_params[index_leaf_node] = np.nan
+        self.fitted_values[index_leaf_node] = None
+        if self.idx_leaf_nodes is not None and self.leaf_pos is not None:
+            # Move the last leaf node to the position of the removed one
+            position = self.leaf_pos[index_leaf_node]
+            last_leaf_node = self.idx_leaf_nodes[self.n_leaves - 1]
+            self.idx_leaf_nodes[position] = last_leaf_node
+            self.leaf_pos[last_leaf_node] = position
+            self.leaf_pos[index_leaf_node] = -1
+            self.n_leaves -= 1
 
     def trim(self) -> "Tree":
-        tree: Dict[int, Node] = {
-            k: Node(
-                value=v.value,
-                nvalue=v.nvalue,
-                idx_data_points=None,
-                idx_split_variable=v.idx_split_variable,
-                linear_params=v.linear_params,
-            )
-            for k, v in self.tree_structure.items()
-        }
+        """Return a copy of the tree without its data points, keeping only the levels in use."""
+        capacity = self._get_used_capacity()
         return Tree(
-            tree_structure=tree,
+            hot_nodes=self.hot_nodes[:capacity].copy(),
+            cold_nodes=self.cold_nodes[:capacity].copy(),
+            split_subsets=self.split_subsets.copy(),
+            leaf_values=self.leaf_values[:capacity].copy(),
+            linear_params=self.linear_params[:capacity].copy(),
+            data_points=None,
+            fitted_values=[None] * capacity,
             idx_leaf_nodes=None,
+            leaf_pos=None,
             output=np.array([-1]),
             split_rules=self.split_rules,
         )
 
-    def get_split_variables(self) -> Generator[int, None, None]:
-        for node in self.tree_structure.values():
-            if node.is_split_node():
-                yield node.idx_split_variable
+    def get_split_variables(self) -> npt.NDArray[np.int_]:
+        """Return the index of the splitting variable of each split node."""
+        split_var = self.split_var
+        return split_var[split_var >= 0]
+
+    def _get_used_capacity(self) -> int:
+        """Return the capacity of the full levels down to the children of the deepest split node."""
+        idx_split_nodes = np.flatnonzero(self.split_var >= 0)
+        if len(idx_split_nodes) == 0:
+            return 1
+        return 2 ** (get_depth(get_idx_right_child(int(idx_split_nodes[-1]))) + 1) - 1
+
+    def _clear_cache(self) -> None:
+        self._subtree_mean = None
+        self._constant_subtrees = None
+        self._compiled_descend = None
+
+    def _ensure_capacity(self, index: int) -> None:
+        """Grow the node arrays, one full level at a time, until `index` fits in them."""
+        capacity = len(self.hot_nodes)
+        if index < capacity:
+            return
+
+        new_capacity = capacity
+        while index >= new_capacity:
+            new_capacity = 2 * new_capacity + 1
+
+        hot_nodes = _new_hot_nodes(new_capacity)
+        hot_nodes[:capacity] = self.hot_nodes
+        self.hot_nodes = hot_nodes
+        cold_nodes = np.zeros(new_capacity, dtype=COLD_NODE_DTYPE)
+        cold_nodes[:capacity] = self.cold_nodes
+        self.cold_nodes = cold_nodes
+        self.leaf_values = _resize(self.leaf_values, new_capacity, 0)
+        self.linear_params = _resize(self.linear_params, new_capacity, np.nan)
+        self.fitted_values.extend([None] * (new_capacity - capacity))
+        if self.idx_leaf_nodes is not None:
+            self.idx_leaf_nodes = _resize(self.idx_leaf_nodes, new_capacity, -1)
+        if self.leaf_pos is not None:
+            self.leaf_pos = _resize(self.leaf_pos, new_capacity, -1)
+
+    def _set_data_points(
+        self, index: int, idx_data_points: Optional[npt.NDArray[np.int32]]
+    ) -> None:
+        if index == 0:
+            start = 0
+        elif index % 2 == 1:
+            # Left child, at the beginning of the slice of its parent
+            start = int(self.cold_nodes[(index - 1) // 2]["data_start"])
+        else:
+            # Right child, after its left sibling
+            start = int(self.cold_nodes[index - 1]["data_stop"])
+
+        stop = start
+        if idx_data_points is not None and self.data_points is not None:
+            stop = start + len(idx_data_points)
+            self.data_points[start:stop] = idx_data_points
+        self.cold_nodes["data_start"][index] = start
+        self.cold_nodes["data_stop"][index] = stop
+
+    def _get_split_value(self, index: int) -> Union[float, npt.NDArray]:
+        split_value = self.split_subsets.get(index)
+        if split_value is None:
+            return self.hot_nodes[index]["split_value"]
+        return split_value
+
+    def _set_split_value(self, index: int, split_value: Union[float, npt.NDArray]) -> None:
+        if np.ndim(split_value) == 0:
+            self.hot_nodes["split_value"][index] = split_value
+            self.split_subsets.pop(index, None)
+        else:
+            self.hot_nodes["split_value"][index] = np.nan
+            self.split_subsets[index] = np.asarray(split_value)
+
+    def _set_leaf_value(
+        self,
+        index: int,
+        value: Union[float, npt.NDArray[np.float_]],
+        linear_params: Optional[List[npt.NDArray[np.float_]]],
+    ) -> None:
+        if linear_params is None:
+            self.leaf_values[index] = value
+            self.linear_params[index] = np.nan
+            self.fitted_values[index] = None
+        else:
+            # The value of a leaf node with a linear response is the fitted value of each of
+            # its data points, with shape (number of data points, shape)
+            self.leaf_values[index] = np.mean(value, axis=0)
+            self.linear_params[index, 0] = linear_params[0]
+            self.linear_params[index, 1] = linear_params[1]
+            self.fitted_values[index] = value
 
     def _predict(self) -> npt.NDArray[np.float_]:
         output = self.output
 
         if self.idx_leaf_nodes is not None:
-            for node_index in self.idx_leaf_nodes:
-                leaf_node = self.get_node(node_index)
-                output[leaf_node.idx_data_points] = leaf_node.value
+            idx_leaf_nodes = self.idx_leaf_nodes[: self.n_leaves]
+            _scatter_leaf_values(
+                output,
+                self.leaf_values,
+                self.data_points,
+                self.data_start,
+                self.data_stop,
+                idx_leaf_nodes,
+            )
+            # Leaf nodes with a linear response have a fitted value per data point
+            for node_index in idx_leaf_nodes[~np.isnan(self.linear_params[idx_leaf_nodes, 0, 0])]:
+                idx_data_points = self.data_points[
+                    self.data_start[node_index] : self.data_stop[node_index]
+                ]
+                output[idx_data_points] = self.fitted_values[node_index]
         return output.T
 
     def predict(
@@ -254,8 +557,106 @@ class Tree:
         if excluded is None:
             excluded = []
 
+        if not excluded and np.ndim(x) <= 2 and self._can_descend():
+            x = np.asarray(x, dtype=np.float64)
+            if x.ndim == 1:
+                leaf_node_index = _descend(self.split_value, self.split_var, x)
+                return np.zeros(shape) + self.leaf_values[leaf_node_index]
+            leaf_nodes_index = _descend_batch(self.split_value, self.split_var, x)
+            return np.zeros((shape, len(x))) + self.leaf_values[leaf_nodes_index].T
+
         return self._traverse_tree(X=x, excluded=excluded, shape=shape)
 
+    def predict_binned(
+        self,
+        X_binned: npt.NDArray[np.uint8],
+        bin_edges: List[npt.NDArray[np.float_]],
+        shape: int = 1,
+    ) -> npt.NDArray[np.float_]:
+        """
+        Predict output of tree for points whose variables have been binned with `bin_features`.
+
+        Each split value is replaced by the index of its bin, so the tree is traversed comparing
+        small integers. The predictions are the same as the ones of `predict` when the bin edges
+        of each variable include its split values, like the unique values of the variables used
+        to fit the tree.
+
+        Parameters
+        ----------
+        X_binned : npt.NDArray[np.uint8]
+            Binned points, with shape (number of points, number of variables)
+        bin_edges : List[npt.NDArray[np.float_]]
+            Sorted bin edges of each variable, the ones used to bin `X_binned`
+
+        Returns
+        -------
+        npt.NDArray[np.float_]
+            Array of shape (shape, number of points)
+        """
+        if not self._can_descend():
+            raise ValueError(
+                "Binned predictions require ContinuousSplitRule and constant leaf node responses"
+            )
+        leaf_nodes_index = _descend_binned(
+            self.get_binned_split_values(bin_edges), self.split_var, X_binned
+        )
+        return np.zeros((shape, len(X_binned))) + self.leaf_values[leaf_nodes_index].T
+
+    def predict_compiled(self, X: npt.NDArray[np.float_], shape: int = 1) -> npt.NDArray[np.float_]:
+        """
+        Predict output of tree for the rows of `X` with a function specialized to the tree.
+
+        The first call generates and compiles a function with the split variables and split
+        values of the tree written as literals in nested conditionals, later calls reuse it
+        until the tree is modified. Compiling is much slower than traversing the tree, so this
+        only pays off when predicting many points with a fixed tree, like when computing partial
+        dependence plots from a posterior.
+
+        Parameters
+        ----------
+        X : npt.NDArray[np.float_]
+            Points to predict, with shape (number of points, number of variables)
+
+        Returns
+        -------
+        npt.NDArray[np.float_]
+            Array of shape (shape, number of points)
+        """
+        if self._compiled_descend is None:
+            if not self._can_descend():
+                raise ValueError(
+                    "Compiled predictions require ContinuousSplitRule and constant leaf node "
+                    "responses"
+                )
+            self._compiled_descend = _codegen_descend(self.split_value, self.split_var)
+        leaf_nodes_index = self._compiled_descend(np.asarray(X, dtype=np.float64))
+        return np.zeros((shape, len(X))) + self.leaf_values[leaf_nodes_index].T
+
+    def get_binned_split_values(
+        self, bin_edges: List[npt.NDArray[np.float_]]
+    ) -> npt.NDArray[np.uint8]:
+        """Return the bin of the split value of each split node, see `bin_features`."""
+        split_var = self.split_var
+        binned_split_value = np.zeros(len(split_var), dtype=np.uint8)
+        for index in np.flatnonzero(split_var >= 0):
+            binned_split_value[index] = np.searchsorted(
+                bin_edges[split_var[index]], self.split_value[index]
+            )
+        return binned_split_value
+
+    def _can_descend(self) -> bool:
+        """
+        Check if the tree can be traversed by comparing a single value at each split node.
+
+        That is the case when all the split nodes use ContinuousSplitRule and all the leaf nodes
+        have a constant response.
+        """
+        if self.split_subsets or not np.all(np.isnan(self.linear_params[:, 0, 0])):
+            return False
+        split_var = self.split_var
+        split_variables = np.unique(split_var[split_var >= 0])
+        return all(self.split_rules[var] is ContinuousSplitRule for var in split_variables)
+
     def _traverse_tree(
         self,
         X: npt.NDArray[np.float_],
@@ -285,29 +686,36 @@ class Tree:
         x_shape = (1,) if len(X.shape) == 1 else X.shape[:-1]
         nd_dims = (...,) + (None,) * len(x_shape)
 
+        is_constant = None
+        if excluded:
+            is_constant = self._get_constant_subtrees(tuple(sorted(set(excluded))))
+            subtree_mean = self._get_subtree_mean()
+
+        split_var, nvalue = self.split_var, self.nvalue
         stack = [(0, np.ones(x_shape), 0)]  # (node_index, weight, idx_split_variable) initial state
         p_d = (
             np.zeros(shape + x_shape) if isinstance(shape, tuple) else np.zeros((shape,) + x_shape)
         )
         while stack:
             node_index, weights, idx_split_variable = stack.pop()
-            node = self.get_node(node_index)
-            if node.is_leaf_node():
-                params = node.linear_params
-                if params is None:
-                    p_d += weights * node.value[nd_dims]
+            if is_constant is not None and is_constant[node_index]:
+                p_d += weights * subtree_mean[node_index][nd_dims]
+            elif split_var[node_index] < 0:
+                params = self.linear_params[node_index]
+                if np.isnan(params[0, 0]):
+                    p_d += weights * self.leaf_values[node_index][nd_dims]
                 else:
                     p_d += weights * (
                         params[0][nd_dims] + params[1][nd_dims] * X[..., idx_split_variable]
                     )
             else:
-                idx_split_variable = node.idx_split_variable
+                idx_split_variable = split_var[node_index]
                 left_node_index, right_node_index = (
                     get_idx_left_child(node_index),
                     get_idx_right_child(node_index),
                 )
                 if excluded is not None and idx_split_variable in excluded:
-                    prop_nvalue_left = self.get_node(left_node_index).nvalue / node.nvalue
+                    prop_nvalue_left = nvalue[left_node_index] / nvalue[node_index]
                     stack.append((left_node_index, weights * prop_nvalue_left, idx_split_variable))
                     stack.append(
                         (right_node_index, weights * (1 - prop_nvalue_left), idx_split_variable)
@@ -315,7 +723,7 @@ class Tree:
                 else:
                     to_left = (
                         self.split_rules[idx_split_variable]
-                        .divide(X[..., idx_split_variable], node.value)
+                        .divide(X[..., idx_split_variable], self._get_split_value(node_index))
                         .astype("float")
                     )
                     stack.append((left_node_index, weights * to_left, idx_split_variable))
@@ -326,21 +734,332 @@ class Tree:
 
         return p_d
 
+    def _get_subtree_mean(self) -> npt.NDArray[np.float_]:
+        """
+        Return the average of the leaf values below each node.
+
+        The average is weighted by the proportion of data points that went to each branch, that
+        is the prediction of the node when all the variables below it are excluded.
+        """
+        if self._subtree_mean is None:
+            self._subtree_mean = _compute_subtree_mean(
+                self.split_var, self.nvalue, self.leaf_values
+            )
+        return self._subtree_mean
+
+    def _get_constant_subtrees(self, excluded: Tuple[int, ...]) -> npt.NDArray[np.bool_]:
+        """
+        Find the nodes whose prediction does not depend on the point being predicted.
+
+        Those are the nodes that only have split nodes on excluded variables and leaf nodes with
+        a constant response below them, their prediction is their subtree mean. Only the result
+        for the last set of excluded variables is kept, the one reused by partial dependence and
+        ICE plots, so trees kept in the posterior do not accumulate one result per set.
+
+        Parameters
+        ----------
+        excluded : Tuple[int, ...]
+            Sorted indexes of the excluded variables
+        """
+        if self._constant_subtrees is None or self._constant_subtrees[0] != excluded:
+            excluded_mask = np.zeros(len(self.split_rules), dtype=np.bool_)
+            excluded_mask[list(excluded)] = True
+            is_constant = _find_constant_subtrees(
+                self.split_var, np.isnan(self.linear_params[:, 0, 0]), excluded_mask
+            )
+            self._constant_subtrees = (excluded, is_constant)
+        return self._constant_subtrees[1]
+
     def _traverse_leaf_values(
-        self, leaf_values: List[npt.NDArray[np.float_]], leaf_n_values: List[int], node_index: int
-    ) -> None:
+        self, node_index: int
+    ) -> Tuple[npt.NDArray[np.float_], npt.NDArray[np.int_]]:
         """
-        Traverse the tree appending leaf values starting from a particular node.
+        Traverse the tree collecting the leaf values starting from a particular node.
 
         Parameters
         ----------
-        leaf_values : List[npt.NDArray[np.float_]]
         node_index : int
+
+        Returns
+        -------
+        Tuple[npt.NDArray[np.float_], npt.NDArray[np.int_]]
+            Value and number of data points of the leaf nodes below `node_index`.
         """
-        node = self.get_node(node_index)
-        if node.is_leaf_node():
-            leaf_values.append(node.value)
-            leaf_n_values.append(node.nvalue)
+        leaf_nodes_index = _collect_leaves(self.split_var, node_index)
+        return self.leaf_values[leaf_nodes_index], self.nvalue[leaf_nodes_index]
+
+
+def bin_features(
+    X: npt.NDArray[np.float_], bin_edges: List[npt.NDArray[np.float_]]
+) -> npt.NDArray[np.uint8]:
+    """
+    Bin each variable of `X`, for `Tree.predict_binned`.
+
+    The bin of a value is the number of bin edges of its variable smaller than it, so a value is
+    less or equal than an edge if and only if its bin is less or equal than the bin of the edge.
+    Missing values go to the last bin.
+
+    Parameters
+    ----------
+    X : npt.NDArray[np.float_]
+        Points to bin, with shape (number of points, number of variables)
+    bin_edges : List[npt.NDArray[np.float_]]
+        Sorted bin edges of each variable, at most 255 per variable
+
+    Returns
+    -------
+    npt.NDArray[np.uint8]
+        Array with the same shape as `X`
+    """
+    if any(len(edges) > 255 for edges in bin_edges):
+        raise ValueError("At most 255 bin edges per variable are supported")
+    X_binned = np.empty(X.shape, dtype=np.uint8)
+    for idx_variable, edges in enumerate(bin_edges):
+        X_binned[:, idx_variable] = np.searchsorted(edges, X[:, idx_variable])
+    return X_binned
+
+
+def predict_ensemble(
+    trees: List[Tree], X: npt.NDArray[np.float_], shape: int = 1
+) -> npt.NDArray[np.float_]:
+    """
+    Predict the sum of the outputs of a list of trees for each row of `X`.
+
+    The trees that can be traversed by comparing a single value at each split node are packed in
+    arrays of shape (number of trees, capacity) and predicted together, adding up the values of
+    all of them for each row in a single pass. The rest of the trees are predicted one at a time.
+
+    Parameters
+    ----------
+    trees : List[Tree]
+        Trees of the ensemble
+    X : npt.NDArray[np.float_]
+        Points to predict, with shape (number of points, number of variables)
+    shape : int
+        Number of output dimensions of the leaf nodes
+
+    Returns
+    -------
+    npt.NDArray[np.float_]
+        Array of shape (shape, number of points)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    pred = np.zeros((shape, len(X)))
+    packed_trees = []
+    for tree in trees:
+        if tree._can_descend():
+            packed_trees.append(tree)
         else:
-            self._traverse_leaf_values(leaf_values, leaf_n_values, get_idx_left_child(node_index))
-            self._traverse_leaf_values(leaf_values, leaf_n_values, get_idx_right_child(node_index))
+            pred += tree.predict(x=X, shape=shape)
+
+    if packed_trees:
+        capacity = max(len(tree.split_var) for tree in packed_trees)
+        split_value = np.full((len(packed_trees), capacity), np.nan)
+        split_var = np.full((len(packed_trees), capacity), -1, dtype=np.int64)
+        leaf_values = np.zeros((len(packed_trees), capacity, packed_trees[0].leaf_values.shape[1]))
+        for idx_tree, tree in enumerate(packed_trees):
+            tree_capacity = len(tree.split_var)
+            split_value[idx_tree, :tree_capacity] = tree.split_value
+            split_var[idx_tree, :tree_capacity] = tree.split_var
+            leaf_values[idx_tree, :tree_capacity] = tree.leaf_values
+        pred += _predict_ensemble(split_value, split_var, leaf_values, X).T
+
+    return pred
+
+
+@njit(**NJIT_OPTIONS, inline="always")
+def _descend(
+    split_value: npt.NDArray[np.float_],
+    split_var: npt.NDArray[np.int_],
+    x: npt.NDArray[np.float_],
+) -> int:
+    """
+    Return the index of the leaf node reached by the point `x`.
+
+    Points go to the left child when ``x <= split_value``, as in ContinuousSplitRule, so missing
+    values go to the right child.
+    """
+    index = 0
+    while split_var[index] >= 0:
+        idx_split_variable = split_var[index]
+        index = 2 * index + 1 + (not x[idx_split_variable] <= split_value[index])
+    return index
+
+
+@njit(**NJIT_OPTIONS)
+def _descend_batch(
+    split_value: npt.NDArray[np.float_],
+    split_var: npt.NDArray[np.int_],
+    X: npt.NDArray[np.float_],
+) -> npt.NDArray[np.int_]:
+    """Return the index of the leaf node reached by each row of `X`."""
+    leaf_nodes_index = np.empty(X.shape[0], dtype=np.int64)
+    for row in range(X.shape[0]):
+        leaf_nodes_index[row] = _descend(split_value, split_var, X[row])
+    return leaf_nodes_index
+
+
+@njit(**NJIT_OPTIONS)
+def _descend_binned(
+    binned_split_value: npt.NDArray[np.uint8],
+    split_var: npt.NDArray[np.int_],
+    X_binned: npt.NDArray[np.uint8],
+) -> npt.NDArray[np.int_]:
+    """Return the index of the leaf node reached by each row of `X_binned`."""
+    leaf_nodes_index = np.empty(X_binned.shape[0], dtype=np.int64)
+    for row in range(X_binned.shape[0]):
+        index = 0
+        while split_var[index] >= 0:
+            idx_split_variable = split_var[index]
+            index = 2 * index + 1 + (X_binned[row, idx_split_variable] > binned_split_value[index])
+        leaf_nodes_index[row] = index
+    return leaf_nodes_index
+
+
+@njit(**NJIT_OPTIONS, parallel=True)
+def _predict_ensemble(
+    split_value: npt.NDArray[np.float_],
+    split_var: npt.NDArray[np.int_],
+    leaf_values: npt.NDArray[np.float_],
+    X: npt.NDArray[np.float_],
+) -> npt.NDArray[np.float_]:
+    """Add up the leaf values reached by each row of `X` in every tree, one row per thread."""
+    pred = np.zeros((X.shape[0], leaf_values.shape[2]))
+    for row in prange(X.shape[0]):
+        for idx_tree in range(split_var.shape[0]):
+            leaf_node_index = _descend(split_value[idx_tree], split_var[idx_tree], X[row])
+            for dim in range(leaf_values.shape[2]):
+                pred[row, dim] += leaf_values[idx_tree, leaf_node_index, dim]
+    return pred
+
+
+@njit(**NJIT_OPTIONS)
+def _scatter_leaf_values(
+    output: npt.NDArray[np.float_],
+    leaf_values: npt.NDArray[np.float_],
+    data_points: npt.NDArray[np.int32],
+    data_start: npt.NDArray[np.int_],
+    data_stop: npt.NDArray[np.int_],
+    idx_leaf_nodes: npt.NDArray[np.int_],
+) -> None:
+    """Write the value of each leaf node to the rows of `output` of its data points."""
+    for node_index in idx_leaf_nodes:
+        for position in range(data_start[node_index], data_stop[node_index]):
+            row = data_points[position]
+            for dim in range(output.shape[1]):
+                output[row, dim] = leaf_values[node_index, dim]
+
+
+@njit(**NJIT_OPTIONS)
+def _collect_leaves(split_var: npt.NDArray[np.int_], node_index: int) -> npt.NDArray[np.int_]:
+    """Return the index of the leaf nodes below `node_index`, from left to right."""
+    # A subtree has at most as many leaf nodes as half the node arrays, plus one, and a depth
+    # first traversal keeps at most one node per level, plus one, in the stack
+    leaf_nodes_index = np.empty(len(split_var) // 2 + 1, dtype=np.int64)
+    stack = np.empty(int(np.log2(len(split_var) + 1)) + 1, dtype=np.int64)
+    stack[0] = node_index
+    stack_size = 1
+    n_leaves = 0
+    while stack_size > 0:
+        stack_size -= 1
+        index = stack[stack_size]
+        if split_var[index] < 0:
+            leaf_nodes_index[n_leaves] = index
+            n_leaves += 1
+        else:
+            stack[stack_size] = 2 * index + 2
+            stack[stack_size + 1] = 2 * index + 1
+            stack_size += 2
+    return leaf_nodes_index[:n_leaves]
+
+
+@njit(**NJIT_OPTIONS)
+def _compute_subtree_mean(
+    split_var: npt.NDArray[np.int_],
+    nvalue: npt.NDArray[np.int_],
+    leaf_values: npt.NDArray[np.float_],
+) -> npt.NDArray[np.float_]:
+    """Average the leaf values below each node weighted by the proportion of data points."""
+    subtree_mean = leaf_values.copy()
+    # Children are always stored after their parent, so a reversed pass sees them first
+    for index in range(len(split_var) - 1, -1, -1):
+        if split_var[index] >= 0:
+            left_node_index = 2 * index + 1
+            prop_nvalue_left = nvalue[left_node_index] / nvalue[index]
+            subtree_mean[index] = (
+                prop_nvalue_left * subtree_mean[left_node_index]
+                + (1 - prop_nvalue_left) * subtree_mean[left_node_index + 1]
+            )
+    return subtree_mean
+
+
+@njit(**NJIT_OPTIONS)
+def _find_constant_subtrees(
+    split_var: npt.NDArray[np.int_],
+    is_constant_leaf: npt.NDArray[np.bool_],
+    excluded_mask: npt.NDArray[np.bool_],
+) -> npt.NDArray[np.bool_]:
+    """Find the nodes with only excluded split variables and constant leaf nodes below them."""
+    is_constant = np.empty(len(split_var), dtype=np.bool_)
+    for index in range(len(split_var) - 1, -1, -1):
+        idx_split_variable = split_var[index]
+        if idx_split_variable < 0:
+            is_constant[index] = is_constant_leaf[index]
+        else:
+            is_constant[index] = (
+                excluded_mask[idx_split_variable]
+                and is_constant[2 * index + 1]
+                and is_constant[2 * index + 2]
+            )
+    return is_constant
+
+
+def _codegen_descend(
+    split_value: npt.NDArray[np.float_], split_var: npt.NDArray[np.int_]
+) -> Callable:
+    """
+    Generate and compile a function returning the index of the leaf node reached by each row.
+
+    It is equivalent to `_descend_batch` for the given tree, with the tree written as nested
+    conditionals, so points go to the left child when ``x <= split_value`` and missing values go
+    to the right child.
+    """
+    lines = [
+        "def descend(X):",
+        "    leaf_nodes_index = np.empty(X.shape[0], dtype=np.int64)",
+        "    for row in range(X.shape[0]):",
+        "        x = X[row]",
+    ]
+
+    def add_node(index: int, indent: str) -> None:
+        if split_var[index] < 0:
+            lines.append(f"{indent}leaf_nodes_index[row] = {index}")
+        else:
+            # repr round-trips floats exactly, except the non finite ones
+            literal = repr(float(split_value[index]))
+            literal = literal.replace("inf", "np.inf").replace("nan", "np.nan")
+            lines.append(f"{indent}if x[{split_var[index]}] <= {literal}:")
+            add_node(get_idx_left_child(index), indent + "    ")
+            lines.append(f"{indent}else:")
+            add_node(get_idx_right_child(index), indent + "    ")
+
+    add_node(0, " " * 8)
+    lines.append("    return leaf_nodes_index")
+    namespace = {"np": np}
+    exec("\n".join(lines), namespace)  # pylint: disable=exec-used
+    return njit(**{**NJIT_OPTIONS, "cache": False})(namespace["descend"])
+
+
+def _new_hot_nodes(capacity: int) -> npt.NDArray:
+    """Return a record array of empty nodes, see HOT_NODE_DTYPE."""
+    hot_nodes = np.empty(capacity, dtype=HOT_NODE_DTYPE)
+    hot_nodes["split_value"] = np.nan
+    hot_nodes["split_var"] = -1
+    return hot_nodes
+
+
+def _resize(array: npt.NDArray, capacity: int, fill_value: float) -> npt.NDArray:
+    """Return a copy of `array` with its first dimension enlarged to `capacity`."""
+    new_array = np.full((capacity,) + array.shape[1:], fill_value, dtype=array.dtype)
+    new_array[: len(array)] = array
+    return new_array
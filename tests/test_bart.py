@@ -81,6 +81,29 @@ def test_missing_data(response):
         idata = pm.sample(tune=100, draws=100, chains=1, random_seed=3415)
 
 
+@pytest.mark.parametrize(
+    argnames="response",
+    argvalues=["constant", "linear"],
+    ids=["constant", "linear-response"],
+)
+def test_missing_data_predict(response):
+    X = np.random.normal(0, 1, size=(50, 2))
+    Y = np.random.normal(0, 1, size=50)
+    X[10:20, 0] = np.nan
+
+    with pm.Model() as model:
+        mu = pmb.BART("mu", X, Y, m=10, response=response)
+        sigma = pm.HalfNormal("sigma", 1)
+        y = pm.Normal("y", mu, sigma, observed=Y)
+        step = pmb.PGBART([mu])
+
+    for _ in range(5):
+        step.astep(None)
+    # Rows with missing values get the value of the leaf node they reach when predicting
+    for particle in step.all_particles[0]:
+        assert_almost_equal(particle.tree._predict(), particle.tree.predict(X), decimal=5)
+
+
 @pytest.mark.parametrize(
     argnames="response",
     argvalues=["constant", "linear"],
@@ -8,6 +8,8 @@ import pymc_bart as pmb
 from pymc_bart.pgbart import (
     NormalSampler,
     UniformSampler,
+    compute_initial_depth,
+    compute_prior_probability,
     discrete_uniform_sampler,
     fast_linear_fit,
     fast_mean,
@@ -63,6 +65,12 @@ def test_fast_linear_fit(x, y, a_expected, b_expected):
     )
 
 
+def test_compute_initial_depth():
+    assert compute_initial_depth(compute_prior_probability(alpha=0.95, beta=2)) == 4
+    assert compute_initial_depth(compute_prior_probability(alpha=0.5, beta=2)) == 3
+    assert compute_initial_depth([0, 1]) == 1
+
+
 def test_discrete_uniform():
     sample = discrete_uniform_sampler(7)
     assert isinstance(sample, int)
@@ -1,6 +1,17 @@
+import pickle
+
 import numpy as np
 
-from pymc_bart.tree import Node, get_depth, get_idx_left_child, get_idx_right_child
+from pymc_bart.split_rules import ContinuousSplitRule
+from pymc_bart.tree import (
+    Node,
+    Tree,
+    bin_features,
+    get_depth,
+    get_idx_left_child,
+    get_idx_right_child,
+    predict_ensemble,
+)
 
 
 def test_split_node():
@@ -27,3 +38,139 @@ def test_leaf_node():
     assert get_idx_right_child(index) == 12
     assert leaf_node.is_split_node() is False
     assert leaf_node.is_leaf_node() is True
+
+
+def test_get_depth():
+    assert [get_depth(index) for index in range(8)] == [0, 1, 1, 2, 2, 2, 2, 3]
+
+
+def grow_stump(capacity=1):
+    """Tree with a single split on the first variable at 1.5, X[:, 0] = [0, 1, 2, 3]."""
+    tree = Tree.new_tree(
+        leaf_node_value=np.zeros(1),
+        idx_data_points=np.arange(4, dtype="int32"),
+        num_observations=4,
+        shape=1,
+        split_rules=[ContinuousSplitRule] * 2,
+        capacity=capacity,
+    )
+    for index, value, idx_data_points in ((1, -1.0, [0, 1]), (2, 1.0, [2, 3])):
+        tree.set_node(
+            index,
+            Node.new_leaf_node(
+                value=np.array([value]),
+                nvalue=2,
+                idx_data_points=np.array(idx_data_points, dtype="int32"),
+            ),
+        )
+    tree.grow_leaf_node(selected_predictor=0, split_value=1.5, index_leaf_node=0)
+    return tree
+
+
+def test_grow_tree():
+    tree = grow_stump()
+    root = tree.get_node(0)
+    assert root.is_split_node()
+    assert root.idx_split_variable == 0
+    assert root.value == 1.5
+    assert root.nvalue == 4
+    assert tree.get_node(1).is_leaf_node()
+    assert np.array_equal(tree.get_node(2).idx_data_points, [2, 3])
+    assert sorted(tree.idx_leaf_nodes[: tree.n_leaves]) == [1, 2]
+    assert all(tree.idx_leaf_nodes[tree.leaf_pos[index]] == index for index in (1, 2))
+    assert tree.leaf_pos[0] == -1
+    assert list(tree.get_split_variables()) == [0]
+    np.testing.assert_array_equal(tree._predict(), [[-1.0, -1.0, 1.0, 1.0]])
+
+
+def test_trim():
+    tree = grow_stump(capacity=15)
+    assert len(tree.split_var) == 15
+    trimmed_tree = tree.trim()
+    assert len(trimmed_tree.split_var) == 3
+    assert list(trimmed_tree.get_split_variables()) == [0]
+    np.testing.assert_array_equal(trimmed_tree.leaf_values[1:], [[-1.0], [1.0]])
+
+
+def test_predict():
+    tree = grow_stump()
+    X = np.array([[0.0, 5.0], [1.5, 5.0], [2.0, 5.0]])
+    np.testing.assert_array_equal(tree.predict(X), [[-1.0, -1.0, 1.0]])
+    np.testing.assert_array_equal(tree.predict(X), tree._traverse_tree(X))
+    np.testing.assert_array_equal(tree.predict(X[2]), [1.0])
+    np.testing.assert_array_equal(tree.predict(X, excluded=[0]), [[0.0, 0.0, 0.0]])
+    np.testing.assert_array_equal(tree.predict(X, excluded=[1]), [[-1.0, -1.0, 1.0]])
+    assert tree._constant_subtrees[0] == (1,)
+    np.testing.assert_array_equal(tree._get_subtree_mean()[:3], [[0.0], [-1.0], [1.0]])
+
+
+def test_predict_binned():
+    tree = grow_stump()
+    X = np.array([[0.0, 5.0], [1.5, 5.0], [2.0, 5.0], [np.nan, 5.0]])
+    bin_edges = [np.array([0.0, 1.0, 1.5, 2.0, 3.0]), np.array([5.0])]
+    X_binned = bin_features(X, bin_edges)
+    np.testing.assert_array_equal(X_binned, [[0, 0], [2, 0], [3, 0], [5, 0]])
+    np.testing.assert_array_equal(tree.get_binned_split_values(bin_edges)[0], 2)
+    np.testing.assert_array_equal(tree.predict_binned(X_binned, bin_edges), tree.predict(X))
+
+
+def test_predict_compiled():
+    tree = grow_stump()
+    X = np.array([[0.0, 5.0], [1.5, 5.0], [2.0, 5.0], [np.nan, 5.0]])
+    np.testing.assert_array_equal(tree.predict_compiled(X), tree.predict(X))
+    assert tree._compiled_descend is not None
+    tree.grow_leaf_node(selected_predictor=1, split_value=4.0, index_leaf_node=2)
+    assert tree._compiled_descend is None
+
+
+def test_predict_ensemble():
+    tree = grow_stump()
+    new_tree = tree.copy()
+    new_tree.grow_leaf_node(selected_predictor=1, split_value=4.0, index_leaf_node=2)
+    for index, value in ((5, 3.0), (6, 5.0)):
+        new_tree.set_node(index, Node.new_leaf_node(value=np.array([value]), nvalue=1))
+    X = np.array([[0.0, 5.0], [2.0, 3.0], [2.0, np.nan]])
+    np.testing.assert_array_equal(
+        predict_ensemble([tree, new_tree], X), tree.predict(X) + new_tree.predict(X)
+    )
+    np.testing.assert_array_equal(predict_ensemble([tree, new_tree], X), [[-2.0, 4.0, 6.0]])
+
+
+def test_traverse_leaf_values():
+    tree = grow_stump()
+    leaf_values, leaf_n_values = tree._traverse_leaf_values(0)
+    np.testing.assert_array_equal(leaf_values, [[-1.0], [1.0]])
+    np.testing.assert_array_equal(leaf_n_values, [2, 2])
+
+
+def test_copy():
+    tree = grow_stump()
+    new_tree = tree.copy()
+    for index, value, idx_data_points in ((3, -2.0, [0]), (4, 0.0, [1])):
+        new_tree.set_node(
+            index,
+            Node.new_leaf_node(
+                value=np.array([value]),
+                nvalue=1,
+                idx_data_points=np.array(idx_data_points, dtype="int32"),
+            ),
+        )
+    new_tree.grow_leaf_node(selected_predictor=1, split_value=0.5, index_leaf_node=1)
+    assert tree.get_node(1).is_leaf_node()
+    assert list(tree.get_split_variables()) == [0]
+    assert sorted(new_tree.get_split_variables()) == [0, 1]
+    np.testing.assert_array_equal(tree._predict(), [[-1.0, -1.0, 1.0, 1.0]])
+    np.testing.assert_array_equal(new_tree._predict(), [[-2.0, 0.0, 1.0, 1.0]])
+
+
+def test_pickle():
+    tree = grow_stump()
+    tree.predict(np.zeros((1, 2)), excluded=[1])
+    new_tree = pickle.loads(pickle.dumps(tree))
+    assert new_tree._subtree_mean is None
+    assert new_tree._constant_subtrees is None
+    assert new_tree.n_leaves == tree.n_leaves
+    assert new_tree.split_rules == tree.split_rules
+    for field in ("split_value", "split_var", "nvalue", "data_start", "data_stop"):
+        np.testing.assert_array_equal(getattr(new_tree, field), getattr(tree, field))
+    np.testing.assert_array_equal(new_tree._predict(), tree._predict())